@@ -5,7 +5,7 @@ import sys
 
 ext = Extension('graiax.silkcoder._silkv3',
                 sources=[*glob('src/c_silkv3/src/*.c'),
-                         "src/c_silkv3/coder.cpp",],
+                         *glob('src/c_silkv3/*.c')],
                 include_dirs=["src/c_silkv3/interface/"])
 
 
@@ -4,12 +4,16 @@
 
 #include "decoder.h"
 #include "encoder.h"
+#include "scanner.h"
 
 static PyMethodDef SilkMethods[] = {
     {"decode", (PyCFunction)(void (*)(void))decode_silk,
      METH_VARARGS | METH_KEYWORDS, "Decode a silk file to pcm file."},
     {"encode", (PyCFunction)(void (*)(void))encode_silk,
      METH_VARARGS | METH_KEYWORDS, "Encode a pcm file to silk file."},
+    {"scan", (PyCFunction)(void (*)(void))scan_silk,
+     METH_VARARGS | METH_KEYWORDS,
+     "Check the packet structure of a silk file without decoding it."},
     {NULL, NULL, 0, NULL} /* Sentinel */
 };
 
@@ -2,36 +2,44 @@
 #include "SKP_Silk_typedef.h"
 
 PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
-  size_t counter;
   SKP_int32 i, k;
   SKP_int16 ret, len, tot_len;
-  SKP_int16 nBytes;
+  SKP_int16 nBytes = 0;
   SKP_uint8
       payload[MAX_BYTES_PER_FRAME * MAX_INPUT_FRAMES * (MAX_LBRR_DELAY + 1)];
   SKP_uint8 *payloadEnd = NULL, *payloadToDec = NULL;
   SKP_uint8 FECpayload[MAX_BYTES_PER_FRAME * MAX_INPUT_FRAMES], *payloadPtr;
   SKP_int16 nBytesFEC;
-  SKP_int16 nBytesPerPacket[MAX_LBRR_DELAY + 1], totBytes;
+  SKP_int16 nBytesPerPacket[MAX_LBRR_DELAY + 1] = {0}, totBytes;
   SKP_int16 out[((FRAME_LENGTH_MS * MAX_API_FS_KHZ) << 1) * MAX_INPUT_FRAMES],
       *outPtr;
   SKP_int32 remainPackets = 0;
   SKP_int32 decSizeBytes, result;
   SKP_uint8 *silkData;
-  SKP_int32 silkDataSize;
+  Py_ssize_t silkDataSize;
   SKP_int32 API_sampleRate = 24000;
   SKP_int32 frames, lost;
   void *psDec;
   SKP_SILK_SDK_DecControlStruct DecControl;
   DataStream outputData;
+  PyObject *writer = NULL;
+  int failed = 0;
 
   SKP_float loss_prob = 0.0f;
 
   static char *kwlist[] = {"silk_data", "output_samplerate", "packet_loss",
-                           NULL};
+                           "writer", NULL};
 
-  if (!PyArg_ParseTupleAndKeywords(args, keyword_args, "y#|if", kwlist,
+  if (!PyArg_ParseTupleAndKeywords(args, keyword_args, "y#|ifO", kwlist,
                                    &silkData, &silkDataSize, &API_sampleRate,
-                                   &loss_prob)) {
+                                   &loss_prob, &writer)) {
+    return NULL;
+  }
+
+  if (writer == Py_None)
+    writer = NULL;
+  if (writer != NULL && !PyCallable_Check(writer)) {
+    PyErr_Format(PyExc_TypeError, "writer should be callable");
     return NULL;
   }
 
@@ -72,15 +80,19 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
   /* Simulate the jitter buffer holding MAX_FEC_DELAY packets */
   for (i = 0; i < MAX_LBRR_DELAY; i++) {
     /* Read payload size */
+    if (silkDataSize - (psRead - silkData) < (Py_ssize_t)sizeof(SKP_int16))
+      break;
     nBytes = *(SKP_int16 *)psRead;
     psRead += sizeof(SKP_int16);
 #ifdef _SYSTEM_IS_BIG_ENDIAN
     swap_endian(&nBytes, 1);
 #endif
-    /* Read payload */
-
-    if (silkDataSize - (psRead - silkData) < (int)nBytes)
+    /* Read payload, stop at end of stream or corrupt length */
+    if (nBytes < 0 || nBytes > MAX_BYTES_PER_FRAME ||
+        silkDataSize - (psRead - silkData) < (int)nBytes) {
+      psRead = silkData + silkDataSize;
       break;
+    }
     memcpy(payloadEnd, psRead, nBytes);
     psRead += nBytes;
 
@@ -90,14 +102,15 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
 
   while (1) {
     /* Read payload size */
-    if (psRead - silkData >= silkDataSize)
+    if (silkDataSize - (psRead - silkData) < (Py_ssize_t)sizeof(SKP_int16))
       break;
     nBytes = *(SKP_int16 *)psRead;
     psRead += sizeof(SKP_int16);
 #ifdef _SYSTEM_IS_BIG_ENDIAN
     swap_endian(&nBytes, 1);
 #endif
-    if (nBytes < 0)
+    /* End of stream or corrupt length, use scan() to tell them apart */
+    if (nBytes < 0 || nBytes > MAX_BYTES_PER_FRAME)
       break;
 
     /* Read payload */
@@ -110,7 +123,7 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
     rand_seed = SKP_RAND(rand_seed);
     if ((((float)((rand_seed >> 16) + (1 << 15))) / 65535.0f >=
          (loss_prob / 100.0f)) &&
-        (counter > 0)) {
+        (nBytes > 0)) {
       nBytesPerPacket[MAX_LBRR_DELAY] = nBytes;
       payloadEnd += nBytes;
     } else {
@@ -155,8 +168,8 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
         ret = SKP_Silk_SDK_Decode(psDec, &DecControl, 0, payloadToDec, nBytes,
                                   outPtr, &len);
         if (ret) {
-          PyErr_Format(PyExc_RuntimeError, "Decode failed");
-          return NULL;
+          failed = 1;
+          goto cleanup;
         }
 
         frames++;
@@ -177,8 +190,8 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
         ret = SKP_Silk_SDK_Decode(psDec, &DecControl, 1, payloadToDec, nBytes,
                                   outPtr, &len);
         if (ret) {
-          PyErr_Format(PyExc_RuntimeError, "Decode failed");
-          return NULL;
+          failed = 1;
+          goto cleanup;
         }
         outPtr += len;
         tot_len += len;
@@ -191,6 +204,15 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
 #endif
     writeDataToStream(&outputData, (unsigned char *)out, sizeof(SKP_int16) * tot_len);
 
+    /* Stream output to writer */
+    if (writer != NULL && outputData.size >= STREAM_FLUSH_SIZE) {
+      Py_BLOCK_THREADS;
+      failed = flushDataStream(&outputData, writer) < 0 ? -1 : 0;
+      Py_UNBLOCK_THREADS;
+      if (failed)
+        goto cleanup;
+    }
+
     /* Update buffer */
     totBytes = 0;
     for (i = 0; i < MAX_LBRR_DELAY; i++) {
@@ -198,8 +220,8 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
     }
     /* Check if the received totBytes is valid */
     if (totBytes < 0 || totBytes > sizeof(payload)) {
-      PyErr_Format(PyExc_RuntimeError, "Decode failed");
-      return NULL;
+      failed = 1;
+      goto cleanup;
     }
     SKP_memmove(payload, &payload[nBytesPerPacket[0]],
                 totBytes * sizeof(SKP_uint8));
@@ -248,8 +270,8 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
         ret = SKP_Silk_SDK_Decode(psDec, &DecControl, 0, payloadToDec, nBytes,
                                   outPtr, &len);
         if (ret) {
-          PyErr_Format(PyExc_RuntimeError, "Decode failed");
-          return NULL;
+          failed = 1;
+          goto cleanup;
         }
 
         frames++;
@@ -271,8 +293,8 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
         ret = SKP_Silk_SDK_Decode(psDec, &DecControl, 1, payloadToDec, nBytes,
                                   outPtr, &len);
         if (ret) {
-          PyErr_Format(PyExc_RuntimeError, "Decode failed");
-          return NULL;
+          failed = 1;
+          goto cleanup;
         }
         outPtr += len;
         tot_len += len;
@@ -285,6 +307,15 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
 #endif
     writeDataToStream(&outputData, (unsigned char *)out, sizeof(SKP_int16) * tot_len);
 
+    /* Stream output to writer */
+    if (writer != NULL && outputData.size >= STREAM_FLUSH_SIZE) {
+      Py_BLOCK_THREADS;
+      failed = flushDataStream(&outputData, writer) < 0 ? -1 : 0;
+      Py_UNBLOCK_THREADS;
+      if (failed)
+        goto cleanup;
+    }
+
     /* Update Buffer */
     totBytes = 0;
     for (i = 0; i < MAX_LBRR_DELAY; i++) {
@@ -293,8 +324,8 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
 
     /* Check if the received totBytes is valid */
     if (totBytes < 0 || totBytes > sizeof(payload)) {
-      PyErr_Format(PyExc_RuntimeError, "Decode failed");
-      return NULL;
+      failed = 1;
+      goto cleanup;
     }
 
     SKP_memmove(payload, &payload[nBytesPerPacket[0]],
@@ -304,8 +335,24 @@ PyObject *decode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
                 MAX_LBRR_DELAY * sizeof(SKP_int16));
   }
 
+cleanup:
   /* Free decoder */
   free(psDec);
   Py_END_ALLOW_THREADS;
-  return Py_BuildValue("y#", outputData.buffer, outputData.size);
+
+  PyObject *output = NULL;
+  if (failed > 0) {
+    PyErr_Format(PyExc_RuntimeError, "Decode failed");
+  } else if (failed < 0) {
+    /* Exception raised by writer */
+  } else if (writer != NULL) {
+    if (flushDataStream(&outputData, writer) == 0) {
+      Py_INCREF(Py_None);
+      output = Py_None;
+    }
+  } else {
+    output = Py_BuildValue("y#", outputData.buffer, outputData.size);
+  }
+  freeDataStream(&outputData);
+  return output;
 };
\ No newline at end of file
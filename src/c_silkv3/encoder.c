@@ -6,10 +6,13 @@ PyObject *encode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
   SKP_int16 nBytes;
   SKP_uint8 payload[MAX_BYTES_PER_FRAME * MAX_INPUT_FRAMES];
   SKP_int16 in[FRAME_LENGTH_MS * MAX_API_FS_KHZ * MAX_INPUT_FRAMES];
-  SKP_int32 encSizeBytes, ret, pcmDataSize, tencent;
+  SKP_int32 encSizeBytes, ret, tencent;
+  Py_ssize_t pcmDataSize;
   void *psEnc = NULL;
   unsigned char *pcmData;
   DataStream outputData;
+  PyObject *writer = NULL;
+  int flushed = 0;
 
   // temp
   int index;
@@ -40,23 +43,24 @@ PyObject *encode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
                            "packet_loss",
                            "use_in_band_fec",
                            "use_dtx",
+                           "writer",
                            NULL};
 
   /* Get input data */
   if (!PyArg_ParseTupleAndKeywords(
-          args, keyword_args, "y#iiip|iiipp", kwlist, &pcmData, &pcmDataSize,
+          args, keyword_args, "y#iiip|iiippO", kwlist, &pcmData, &pcmDataSize,
           &API_fs_Hz, &max_internal_fs_Hz, &targetRate_bps, &tencent,
           &complexity_mode, &packetSize_ms, &packetLoss_perc,
-          &INBandFEC_enabled, &DTX_enabled))
+          &INBandFEC_enabled, &DTX_enabled, &writer))
     return NULL;
   unsigned char *psRead = pcmData, *psReadEnd = pcmData + pcmDataSize;
 
-  if (API_fs_Hz > MAX_API_FS_KHZ * 1000 || API_fs_Hz < 0)
-    goto failed;
-
-  initializeDataStream(&outputData, ENCODE_MAX_BYTES_PER_FRAME *
-                                        MAX_INPUT_FRAMES * 1000 /
-                                        packetSize_ms);
+  if (writer == Py_None)
+    writer = NULL;
+  if (writer != NULL && !PyCallable_Check(writer)) {
+    PyErr_Format(PyExc_TypeError, "writer should be callable");
+    return NULL;
+  }
 
   int input_samplerate_support[] = {8000,  12000, 16000, 24000,
                                     32000, 44100, 48000};
@@ -98,6 +102,11 @@ PyObject *encode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
                  "maximum_samplerate should in [8000, 12000, 16000, 24000]");
     return NULL;
   };
+
+  initializeDataStream(&outputData, ENCODE_MAX_BYTES_PER_FRAME *
+                                        MAX_INPUT_FRAMES * 1000 /
+                                        packetSize_ms);
+
   if (tencent) {
     writeDataToStream(&outputData, (unsigned char *)&index, 1);
   }
@@ -177,6 +186,15 @@ PyObject *encode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
       writeDataToStream(&outputData, payload, sizeof(SKP_uint8) * nBytes);
 
       smplsSinceLastPacket = 0;
+
+      /* Stream output to writer */
+      if (writer != NULL && outputData.size >= STREAM_FLUSH_SIZE) {
+        Py_BLOCK_THREADS;
+        flushed = flushDataStream(&outputData, writer);
+        Py_UNBLOCK_THREADS;
+        if (flushed < 0)
+          break;
+      }
     }
   }
 
@@ -190,10 +208,26 @@ PyObject *encode_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
   free(psEnc);
 
   Py_END_ALLOW_THREADS;
-  return Py_BuildValue("y#", outputData.buffer, outputData.size);
+
+  PyObject *result;
+  if (flushed < 0) {
+    result = NULL;
+  } else if (writer != NULL) {
+    result = NULL;
+    if (flushDataStream(&outputData, writer) == 0) {
+      Py_INCREF(Py_None);
+      result = Py_None;
+    }
+  } else {
+    result = Py_BuildValue("y#", outputData.buffer, outputData.size);
+  }
+  freeDataStream(&outputData);
+  return result;
 
 failed:
   if (psEnc)
     free(psEnc);
-  return 0;
+  freeDataStream(&outputData);
+  PyErr_Format(PyExc_RuntimeError, "Encoder initialization failed");
+  return NULL;
 }
\ No newline at end of file
@@ -0,0 +1,75 @@
+#include "scanner.h"
+
+/* Walk the packet length table without decoding anything */
+PyObject *scan_silk(PyObject *self, PyObject *args, PyObject *keyword_args) {
+  Py_buffer silkData;
+  const unsigned char *psRead, *psReadEnd, *psLastPacketEnd;
+  SKP_int16 nBytes;
+  Py_ssize_t packets = 0;
+  int status = SCAN_VALID, tencent = 0, terminated = 0;
+
+  static char *kwlist[] = {"silk_data", NULL};
+
+  if (!PyArg_ParseTupleAndKeywords(args, keyword_args, "y*", kwlist,
+                                   &silkData))
+    return NULL;
+
+  psRead = (const unsigned char *)silkData.buf;
+  psReadEnd = psRead + silkData.len;
+
+  Py_BEGIN_ALLOW_THREADS;
+
+  /* Check Silk header */
+  if (silkData.len >= 9 && memcmp(psRead, "#!SILK_V3", 9) == 0) {
+    psRead += 9;
+  } else if (silkData.len >= 10 && psRead[0] <= 3 &&
+             memcmp(psRead + 1, "#!SILK_V3", 9) == 0) {
+    psRead += 10;
+    tencent = 1;
+  } else {
+    status = SCAN_MISSING_HEADER;
+    psReadEnd = psRead;
+  }
+  psLastPacketEnd = psRead;
+
+  while (psRead < psReadEnd) {
+    /* Read payload size */
+    if (psReadEnd - psRead < (Py_ssize_t)sizeof(SKP_int16)) {
+      status = SCAN_TRUNCATED;
+      break;
+    }
+    nBytes = (SKP_int16)(psRead[0] | (psRead[1] << 8));
+    psRead += sizeof(SKP_int16);
+
+    /* End of stream written by non-tencent encoders */
+    if (nBytes == -1) {
+      terminated = 1;
+      break;
+    }
+    if (nBytes < 0 || nBytes > MAX_BYTES_PER_FRAME) {
+      status = SCAN_BAD_LENGTH;
+      break;
+    }
+
+    /* Skip payload */
+    if (psReadEnd - psRead < nBytes) {
+      status = SCAN_TRUNCATED;
+      break;
+    }
+    psRead += nBytes;
+    psLastPacketEnd = psRead;
+    packets++;
+  }
+
+  /* Non-tencent files must end with -1, and a file without any packet was
+     cut off right after its header */
+  if (status == SCAN_VALID && ((!tencent && !terminated) || packets == 0))
+    status = SCAN_TRUNCATED;
+
+  Py_END_ALLOW_THREADS;
+
+  Py_ssize_t validSize = psLastPacketEnd - (const unsigned char *)silkData.buf;
+  PyBuffer_Release(&silkData);
+  return Py_BuildValue("(iNnn)", status, PyBool_FromLong(tencent), packets,
+                       validSize);
+}
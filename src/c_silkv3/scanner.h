@@ -0,0 +1,22 @@
+#ifndef _SCANNER_H_
+#define _SCANNER_H_
+
+#include "SKP_Silk_SDK_API.h"
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include <string.h>
+
+/* Largest payload SKP_Silk_SDK_Decode accepts (MAX_ARITHM_BYTES) */
+#define MAX_BYTES_PER_FRAME 1024
+
+/* Keep in sync with ScanStatus in scanner.py */
+#define SCAN_VALID 0
+#define SCAN_TRUNCATED 1
+#define SCAN_BAD_LENGTH 2
+#define SCAN_MISSING_HEADER 3
+
+PyObject *scan_silk(PyObject *self, PyObject *args, PyObject *keyword_args);
+
+#endif /* _SCANNER_H_ */
@@ -35,6 +35,21 @@ void freeDataStream(DataStream *stream) {
   stream->capacity = 0;
 }
 
+/* Pass buffered data to writer and empty the stream, GIL must be held */
+int flushDataStream(DataStream *stream, PyObject *writer) {
+  PyObject *result;
+
+  if (stream->size == 0)
+    return 0;
+  result = PyObject_CallFunction(writer, "y#", stream->buffer,
+                                 (Py_ssize_t)stream->size);
+  if (result == NULL)
+    return -1;
+  Py_DECREF(result);
+  stream->size = 0;
+  return 0;
+}
+
 int findIndex(int targetNumber, int array[], int size) {
   for (int i = 0; i < size; ++i) {
     if (array[i] == targetNumber) {
@@ -1,10 +1,16 @@
 #ifndef _UTILS_H_
 #define _UTILS_H_
 
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 
+/* Hand output to the Python writer once this much has been buffered */
+#define STREAM_FLUSH_SIZE 8192
+
 typedef struct {
   unsigned char *buffer;
   size_t size;
@@ -15,6 +21,7 @@ typedef struct {
 void initializeDataStream(DataStream *stream, size_t initialCapacity);
 void writeDataToStream(DataStream *stream, unsigned char *data, size_t dataSize);
 void freeDataStream(DataStream *stream);
+int flushDataStream(DataStream *stream, PyObject *writer);
 int findIndex(int targetNumber, int array[], int size);
 
 #endif /* _STREAM_H_ */
\ No newline at end of file
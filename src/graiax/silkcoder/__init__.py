@@ -2,19 +2,24 @@
 一个不占GIL锁的SilkV3编解码器
 注：单个音频压制还是单线程，但是压制时不占用GIL锁
 """
+import asyncio
 import os
 import sys
+from functools import partial
 from io import BytesIO
 from pathlib import Path
 from typing import Optional, Union
 
 from .ffmpeg import *
 from .libsndfile import *
-from .utils import Codec, input_transform, output_transform, choose_decoder, choose_encoder
+from .silence import *
+from .utils import Codec, Output, Sink, choose_decoder, choose_encoder, input_transform, make_sink
 from .wav import *
+from .wav import wav_header
 
 try:
     from .silkv3 import *
+    from .scanner import *
 except RuntimeError as e:
     if sys.platform == "win32":
         raise RuntimeError(
@@ -26,8 +31,24 @@ filelike = Union[os.PathLike, str, BytesIO]
 Num = Union[int, float]
 
 
+def _trim_silence(pcm: bytes,
+                  silence_threshold: float = DEFAULT_SILENCE_THRESHOLD,
+                  on_trim=None,
+                  **kwargs) -> bytes:
+    pcm, trimmed = strip_silence(pcm, silence_threshold)
+    if on_trim is not None:
+        on_trim(trimmed)
+    return pcm
+
+
+def _silk_to_wav(silk: bytes, sink: Sink):
+    # 边解码边输出，输出能 seek 的话（路径、内存）再补上带长度的文件头
+    size = wav_stream_decode(partial(silk_decode, silk), sink.write)
+    sink.patch(0, wav_header(size))
+
+
 async def async_encode(input_voice: Union[filelike, bytes],
-                       output_voice: Union[filelike, None] = None,
+                       output_voice: Output = None,
                        /,
                        codec: Optional[Codec] = None,
                        rate: int = -1,
@@ -35,13 +56,16 @@ async def async_encode(input_voice: Union[filelike, bytes],
                        t: Num = -1,
                        tencent: bool = True,
                        ios_adaptive: bool = False,
+                       dtx: bool = False,
+                       trim_silence: bool = False,
                        **kwargs) -> Optional[bytes]:
     """
     将音频文件转化为 silkv3 格式
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件(silk)，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标(silk)，默认为None，为None时将返回bytes
+            输出会在编码过程中分块写入；路径会先写入临时文件再换名；异步版本还支持异步写入函数
         codec(Codec) 编码器，可选 wave, libsndfile, ffmpeg 默认状态下会让程序自行判断
 
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由所选处理器解析格式)
@@ -50,6 +74,10 @@ async def async_encode(input_voice: Union[filelike, bytes],
         t(Num) 持续读取时间,对应 ffmpeg 中的 t (只能精确到秒) 默认为0(不剪切)
         tencent(bool) 是否转化成腾讯的格式
         ios_adaptive(bool) 是否适配 iOS 设备（iOS 的音频码率上限比其他平台低）
+        dtx(bool) 是否开启 DTX（静音帧只输出空包），适合停顿较多的语音 默认为False
+        trim_silence(bool) 是否在编码前裁掉首尾的静音 默认为False
+        silence_threshold(float) 静音阈值(dBFS) 默认为-45
+        on_trim(Callable[[TrimResult], Any]) 裁剪后的回调，可以得知裁掉了多少秒
         ffmpeg_para(list) 额外的 ffmpeg 参数(假设是 ffmpeg 的话)（如 ['-ar', '24000']）
     """
     input_bytes = input_transform(input_voice)
@@ -66,13 +94,16 @@ async def async_encode(input_voice: Union[filelike, bytes],
         ffmpeg_para = kwargs.get("ffmpeg_para")
         pcm = await async_ffmpeg_encode(input_bytes, audio_format, ss, t, ffmpeg_para)
 
-    silk = await async_silk_encode(pcm, rate, tencent, ios_adaptive)
+    if trim_silence:
+        pcm = _trim_silence(pcm, **kwargs)
 
-    return output_transform(output_voice, silk)
+    async with make_sink(output_voice) as sink:
+        await async_silk_encode(pcm, rate, tencent, ios_adaptive, sink.write, dtx)
+    return sink.getvalue()
 
 
 async def async_decode(input_voice: Union[filelike, bytes],
-                       output_voice: Union[filelike, None] = None,
+                       output_voice: Output = None,
                        /,
                        codec: Optional[Codec] = None,
                        audio_format: Optional[str] = None,
@@ -82,7 +113,8 @@ async def async_decode(input_voice: Union[filelike, bytes],
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件(silk)
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标，默认为None，为None时将返回bytes
+            输出会分块写入；路径会先写入临时文件再换名；异步版本还支持异步写入函数
         codec(Codec) 编码器，可选 wave, libsndfile, ffmpeg 默认状态下会让程序自行判断
 
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由ffmpeg解析格式)
@@ -100,32 +132,33 @@ async def async_decode(input_voice: Union[filelike, bytes],
     if codec is None:
         codec = choose_decoder(audio_format)
 
-    pcm = await async_silk_decode(input_bytes)
-
-    if codec == Codec.wave:
-        audio = wav_decode(pcm)
-    elif codec == Codec.libsndfile:
-        metadata = kwargs.get("metadata")
-        quality = kwargs.get("quality")
-        subtype = kwargs.get("subtype")
-        audio = await async_sndfile_decode(pcm, audio_format, subtype, quality, metadata)
-    elif codec == Codec.ffmpeg:
-        rate = kwargs.get("rate")
-        metadata = kwargs.get("metadata")
-        ffmpeg_para = kwargs.get("ffmpeg_para")
-        audio = await async_ffmpeg_decode(
-            pcm,
-            audio_format,
-            ffmpeg_para,
-            rate,
-            metadata,
-        )
-
-    return output_transform(output_voice, audio)
+    async with make_sink(output_voice) as sink:
+        if codec == Codec.wave:
+            await asyncio.get_running_loop().run_in_executor(None, _silk_to_wav, input_bytes, sink)
+        elif codec == Codec.libsndfile:
+            # libsndfile 要拿到完整的 pcm 才能编码
+            pcm = await async_silk_decode(input_bytes)
+            metadata = kwargs.get("metadata")
+            quality = kwargs.get("quality")
+            subtype = kwargs.get("subtype")
+            await async_sndfile_decode(pcm, audio_format, subtype, quality, metadata, sink.write)
+        elif codec == Codec.ffmpeg:
+            rate = kwargs.get("rate")
+            metadata = kwargs.get("metadata")
+            ffmpeg_para = kwargs.get("ffmpeg_para")
+            await async_ffmpeg_decode(
+                partial(silk_decode, input_bytes),
+                audio_format,
+                ffmpeg_para,
+                rate,
+                metadata,
+                sink.awrite,
+            )
+    return sink.getvalue()
 
 
 def encode(input_voice: Union[filelike, bytes],
-           output_voice: Union[filelike, None] = None,
+           output_voice: Output = None,
            /,
            codec: Optional[Codec] = None,
            rate: int = -1,
@@ -133,13 +166,16 @@ def encode(input_voice: Union[filelike, bytes],
            t: Num = -1,
            tencent: bool = True,
            ios_adaptive: bool = False,
+           dtx: bool = False,
+           trim_silence: bool = False,
            **kwargs) -> Optional[bytes]:
     """
     将音频文件转化为 silkv3 格式
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件(silk)，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标(silk)，默认为None，为None时将返回bytes
+            输出会在编码过程中分块写入；路径会先写入临时文件再换名；异步版本还支持异步写入函数
         codec(Codec) 编码器，可选 wave, libsndfile, ffmpeg 默认状态下会让程序自行判断
 
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由 ffmpeg 解析格式)
@@ -148,6 +184,10 @@ def encode(input_voice: Union[filelike, bytes],
         t(Num) 持续读取时间,对应 ffmpeg 中的 t (只能精确到秒) 默认为0(不剪切)
         tencent(bool) 是否转化成腾讯的格式
         ios_adaptive(bool) 是否适配 iOS 设备（iOS 的音频码率上限比其他平台低）
+        dtx(bool) 是否开启 DTX（静音帧只输出空包），适合停顿较多的语音 默认为False
+        trim_silence(bool) 是否在编码前裁掉首尾的静音 默认为False
+        silence_threshold(float) 静音阈值(dBFS) 默认为-45
+        on_trim(Callable[[TrimResult], Any]) 裁剪后的回调，可以得知裁掉了多少秒
         ffmpeg_para(list) 额外的 ffmpeg 参数(假设是 ffmpeg 的话)（如 ['-ar', '24000']）
     """
 
@@ -166,12 +206,16 @@ def encode(input_voice: Union[filelike, bytes],
         ffmpeg_para = kwargs.get("ffmpeg_para")
         pcm = ffmpeg_encode(input_bytes, audio_format, ss, t, ffmpeg_para)
 
-    silk = silk_encode(pcm, rate, tencent, ios_adaptive)
-    return output_transform(output_voice, silk)
+    if trim_silence:
+        pcm = _trim_silence(pcm, **kwargs)
+
+    with make_sink(output_voice) as sink:
+        silk_encode(pcm, rate, tencent, ios_adaptive, sink.write, dtx)
+    return sink.getvalue()
 
 
 def decode(input_voice: Union[filelike, bytes],
-           output_voice: Union[filelike, None] = None,
+           output_voice: Output = None,
            /,
            codec: Optional[Codec] = None,
            audio_format: Optional[str] = None,
@@ -181,7 +225,8 @@ def decode(input_voice: Union[filelike, bytes],
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件(silk)
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标，默认为None，为None时将返回bytes
+            输出会分块写入；路径会先写入临时文件再换名；异步版本还支持异步写入函数
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由ffmpeg解析格式)
         codec(str) 编码器(如果需要) 默认为None
         ensure_ffmpeg(bool) 在音频能用wave库输出时是否强制使用ffmpeg导出 默认为False
@@ -189,7 +234,6 @@ def decode(input_voice: Union[filelike, bytes],
         ffmpeg_para(list) ffmpeg/avconc自定义参数 默认为None
     """
     input_bytes = input_transform(input_voice)
-    pcm = silk_decode(input_bytes)
 
     if audio_format is None:
         if isinstance(output_voice, (os.PathLike, str)):
@@ -199,17 +243,20 @@ def decode(input_voice: Union[filelike, bytes],
     if codec is None:
         codec = choose_decoder(audio_format)
 
-    if codec == Codec.wave:
-        audio = wav_decode(pcm)
-    elif codec == Codec.libsndfile:
-        metadata = kwargs.get("metadata")
-        quality = kwargs.get("quality")
-        subtype = kwargs.get("subtype")
-        audio = sndfile_decode(pcm, audio_format, subtype, quality, metadata)
-    elif codec == Codec.ffmpeg:
-        rate = kwargs.get("rate")
-        metadata = kwargs.get("metadata")
-        ffmpeg_para = kwargs.get("ffmpeg_para")
-        audio = ffmpeg_decode(pcm, audio_format, ffmpeg_para, rate, metadata)
-
-    return output_transform(output_voice, audio)
+    with make_sink(output_voice) as sink:
+        if codec == Codec.wave:
+            _silk_to_wav(input_bytes, sink)
+        elif codec == Codec.libsndfile:
+            # libsndfile 要拿到完整的 pcm 才能编码
+            pcm = silk_decode(input_bytes)
+            metadata = kwargs.get("metadata")
+            quality = kwargs.get("quality")
+            subtype = kwargs.get("subtype")
+            sndfile_decode(pcm, audio_format, subtype, quality, metadata, sink.write)
+        elif codec == Codec.ffmpeg:
+            rate = kwargs.get("rate")
+            metadata = kwargs.get("metadata")
+            ffmpeg_para = kwargs.get("ffmpeg_para")
+            ffmpeg_decode(partial(silk_decode, input_bytes), audio_format, ffmpeg_para, rate,
+                          metadata, sink.write)
+    return sink.getvalue()
@@ -1,7 +1,9 @@
-from typing import Dict, Union, Optional, Literal, List, overload
+from typing import Any, Callable, Dict, Union, Optional, Literal, List, overload
 from io import BytesIO
 from os import PathLike
-from .utils import Codec
+from .utils import Codec, Output
+from .silence import *
+from .scanner import *
 from numbers import Real
 
 filelike = Union[PathLike, str, BytesIO]
@@ -9,20 +11,24 @@ Num = Union[int, float]
 
 @overload
 async def async_encode(input_voice: Union[filelike, bytes],
-                       output_voice: Union[filelike, None] = None,
+                       output_voice: Output = None,
                        /,
                        codec: Literal[Codec.wave] = Codec.wave,
                        rate: int = -1,
                        ss: Num = 0,
                        t: Num = -1,
                        tencent: bool = True,
-                       ios_adaptive: bool = False) -> Optional[bytes]:
+                       ios_adaptive: bool = False,
+                       dtx: bool = False,
+                       trim_silence: bool = False,
+                       silence_threshold: float = DEFAULT_SILENCE_THRESHOLD,
+                       on_trim: Optional[Callable[[TrimResult], Any]] = None) -> Optional[bytes]:
     """
     将音频文件转化为 silkv3 格式
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件(silk)，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标(silk)，默认为None，为None时将返回bytes
 
         codec(Codec.wave) 编码器，这里是 python 的 wave 标准库
         rate(int) silk码率 默认为None 此时编码器将会尝试将码率限制在980kb (若时常在10min内，将严守1Mb线)
@@ -30,12 +36,16 @@ async def async_encode(input_voice: Union[filelike, bytes],
         t(Num) 持续读取时间,对应 ffmpeg 中的 t (只能精确到秒) 默认为0(不剪切)
         tencent(bool) 是否转化成腾讯的格式
         ios_adaptive(bool) 是否适配 iOS 设备（iOS 的音频码率上限比其他平台低）
+        dtx(bool) 是否开启 DTX（静音帧只输出空包），适合停顿较多的语音 默认为False
+        trim_silence(bool) 是否在编码前裁掉首尾的静音 默认为False
+        silence_threshold(float) 静音阈值(dBFS) 默认为-45
+        on_trim(Callable[[TrimResult], Any]) 裁剪后的回调，可以得知裁掉了多少秒
     """
     ...
 
 @overload
 async def async_encode(input_voice: Union[filelike, bytes],
-                       output_voice: Union[filelike, None] = None,
+                       output_voice: Output = None,
                        /,
                        codec: Literal[Codec.libsndfile] = Codec.libsndfile,
                        audio_format: Optional[str] = None,
@@ -43,13 +53,17 @@ async def async_encode(input_voice: Union[filelike, bytes],
                        ss: Num = 0,
                        t: Num = -1,
                        tencent: bool = True,
-                       ios_adaptive: bool = False) -> Optional[bytes]:
+                       ios_adaptive: bool = False,
+                       dtx: bool = False,
+                       trim_silence: bool = False,
+                       silence_threshold: float = DEFAULT_SILENCE_THRESHOLD,
+                       on_trim: Optional[Callable[[TrimResult], Any]] = None) -> Optional[bytes]:
     """
     将音频文件转化为 silkv3 格式
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件(silk)，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标(silk)，默认为None，为None时将返回bytes
 
         codec(Codec.libsndfile) 编码器，这里是 libsndfile
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由 libsndfile 解析格式)
@@ -58,12 +72,16 @@ async def async_encode(input_voice: Union[filelike, bytes],
         t(Num) 持续读取时间,对应 ffmpeg 中的 t (只能精确到秒) 默认为0(不剪切)
         tencent(bool) 是否转化成腾讯的格式
         ios_adaptive(bool) 是否适配 iOS 设备（iOS 的音频码率上限比其他平台低）
+        dtx(bool) 是否开启 DTX（静音帧只输出空包），适合停顿较多的语音 默认为False
+        trim_silence(bool) 是否在编码前裁掉首尾的静音 默认为False
+        silence_threshold(float) 静音阈值(dBFS) 默认为-45
+        on_trim(Callable[[TrimResult], Any]) 裁剪后的回调，可以得知裁掉了多少秒
     """
     ...
 
 @overload
 async def async_encode(input_voice: Union[filelike, bytes],
-                       output_voice: Union[filelike, None] = None,
+                       output_voice: Output = None,
                        /,
                        codec: Literal[Codec.ffmpeg] = Codec.ffmpeg,
                        audio_format: Optional[str] = None,
@@ -72,13 +90,17 @@ async def async_encode(input_voice: Union[filelike, bytes],
                        t: Num = -1,
                        tencent: bool = True,
                        ios_adaptive: bool = False,
+                       dtx: bool = False,
+                       trim_silence: bool = False,
+                       silence_threshold: float = DEFAULT_SILENCE_THRESHOLD,
+                       on_trim: Optional[Callable[[TrimResult], Any]] = None,
                        ffmpeg_para: Optional[List[str]] = None) -> Optional[bytes]:
     """
     将音频文件转化为 silkv3 格式
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件(silk)，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标(silk)，默认为None，为None时将返回bytes
 
         codec(Codec.ffmpeg) 编码器，这里是 ffmpeg
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由 ffmpeg 解析格式)
@@ -87,13 +109,17 @@ async def async_encode(input_voice: Union[filelike, bytes],
         t(Num) 持续读取时间,对应 ffmpeg 中的 t (只能精确到秒) 默认为0(不剪切)
         tencent(bool) 是否转化成腾讯的格式
         ios_adaptive(bool) 是否适配 iOS 设备（iOS 的音频码率上限比其他平台低）
+        dtx(bool) 是否开启 DTX（静音帧只输出空包），适合停顿较多的语音 默认为False
+        trim_silence(bool) 是否在编码前裁掉首尾的静音 默认为False
+        silence_threshold(float) 静音阈值(dBFS) 默认为-45
+        on_trim(Callable[[TrimResult], Any]) 裁剪后的回调，可以得知裁掉了多少秒
         ffmpeg_para(list) 额外的 ffmpeg 参数（如 ['-ar', '24000']）
     """
     ...
 
 @overload
 async def async_decode(input_voice: Union[filelike, bytes],
-                       output_voice: Union[filelike, None] = None,
+                       output_voice: Output = None,
                        /,
                        codec: Literal[Codec.wave] = Codec.wave) -> Optional[bytes]:
     """
@@ -101,14 +127,14 @@ async def async_decode(input_voice: Union[filelike, bytes],
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件(silk)
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标，默认为None，为None时将返回bytes
         codec(Codec.wave) 编码器，这里是 python 的 wave 标准库
     """
     ...
 
 @overload
 async def async_decode(input_voice: Union[filelike, bytes],
-                       output_voice: Union[filelike, None] = None,
+                       output_voice: Output = None,
                        /,
                        codec: Literal[Codec.libsndfile] = Codec.libsndfile,
                        audio_format: Optional[str] = None,
@@ -120,7 +146,7 @@ async def async_decode(input_voice: Union[filelike, bytes],
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件(silk)
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标，默认为None，为None时将返回bytes
 
         codec(Codec.libsndfile) 编码器，这里是 libsndfile
         audio_format(str) 音频格式(如mp3, ogg) 默认为None（此时将由 libsndfile 解析格式）
@@ -131,7 +157,7 @@ async def async_decode(input_voice: Union[filelike, bytes],
 
 @overload
 async def async_decode(input_voice: Union[filelike, bytes],
-                       output_voice: Union[filelike, None] = None,
+                       output_voice: Output = None,
                        /,
                        codec: Literal[Codec.ffmpeg] = Codec.ffmpeg,
                        audio_format: Optional[str] = None,
@@ -143,7 +169,7 @@ async def async_decode(input_voice: Union[filelike, bytes],
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件(silk)
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标，默认为None，为None时将返回bytes
 
         codec(Codec.ffmpeg) 编码器，这里是 ffmpeg
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由 ffmpeg 解析格式)
@@ -155,20 +181,24 @@ async def async_decode(input_voice: Union[filelike, bytes],
 
 @overload
 def encode(input_voice: Union[filelike, bytes],
-           output_voice: Union[filelike, None] = None,
+           output_voice: Output = None,
            /,
            codec: Literal[Codec.wave] = Codec.wave,
            rate: int = -1,
            ss: Num = 0,
            t: Num = -1,
            tencent: bool = True,
-           ios_adaptive: bool = False) -> Optional[bytes]:
+           ios_adaptive: bool = False,
+           dtx: bool = False,
+           trim_silence: bool = False,
+           silence_threshold: float = DEFAULT_SILENCE_THRESHOLD,
+           on_trim: Optional[Callable[[TrimResult], Any]] = None) -> Optional[bytes]:
     """
     将音频文件转化为 silkv3 格式
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件(silk)，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标(silk)，默认为None，为None时将返回bytes
         
         codec(Codec.wave) 编码器，这里是 python 的 wave 标准库
         rate(int) silk码率 默认为None 此时编码器将会尝试将码率限制在980kb (若时常在10min内，将严守1Mb线)
@@ -176,12 +206,16 @@ def encode(input_voice: Union[filelike, bytes],
         t(Num) 持续读取时间,对应 ffmpeg 中的 t (只能精确到秒) 默认为0(不剪切)
         tencent(bool) 是否转化成腾讯的格式
         ios_adaptive(bool) 是否适配 iOS 设备（iOS 的音频码率上限比其他平台低）
+        dtx(bool) 是否开启 DTX（静音帧只输出空包），适合停顿较多的语音 默认为False
+        trim_silence(bool) 是否在编码前裁掉首尾的静音 默认为False
+        silence_threshold(float) 静音阈值(dBFS) 默认为-45
+        on_trim(Callable[[TrimResult], Any]) 裁剪后的回调，可以得知裁掉了多少秒
     """
     ...
 
 @overload
 def encode(input_voice: Union[filelike, bytes],
-           output_voice: Union[filelike, None] = None,
+           output_voice: Output = None,
            codec: Literal[Codec.libsndfile] = Codec.libsndfile,
            /,
            audio_format: Optional[str] = None,
@@ -189,13 +223,17 @@ def encode(input_voice: Union[filelike, bytes],
            ss: Num = 0,
            t: Num = -1,
            tencent: bool = True,
-           ios_adaptive: bool = False) -> Optional[bytes]:
+           ios_adaptive: bool = False,
+           dtx: bool = False,
+           trim_silence: bool = False,
+           silence_threshold: float = DEFAULT_SILENCE_THRESHOLD,
+           on_trim: Optional[Callable[[TrimResult], Any]] = None) -> Optional[bytes]:
     """
     将音频文件转化为 silkv3 格式
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件(silk)，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标(silk)，默认为None，为None时将返回bytes
         codec(Codec.libsndfile) 编码器，这里是 libsndfile
 
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由 libsndfile 解析格式)
@@ -204,12 +242,16 @@ def encode(input_voice: Union[filelike, bytes],
         t(Num) 持续读取时间,对应 ffmpeg 中的 t (只能精确到秒) 默认为0(不剪切)
         tencent(bool) 是否转化成腾讯的格式
         ios_adaptive(bool) 是否适配 iOS 设备（iOS 的音频码率上限比其他平台低）
+        dtx(bool) 是否开启 DTX（静音帧只输出空包），适合停顿较多的语音 默认为False
+        trim_silence(bool) 是否在编码前裁掉首尾的静音 默认为False
+        silence_threshold(float) 静音阈值(dBFS) 默认为-45
+        on_trim(Callable[[TrimResult], Any]) 裁剪后的回调，可以得知裁掉了多少秒
     """
     ...
 
 @overload
 def encode(input_voice: Union[filelike, bytes],
-           output_voice: Union[filelike, None] = None,
+           output_voice: Output = None,
            /,
            codec: Literal[Codec.ffmpeg] = Codec.ffmpeg,
            audio_format: Optional[str] = None,
@@ -218,13 +260,17 @@ def encode(input_voice: Union[filelike, bytes],
            t: Num = -1,
            tencent: bool = True,
            ios_adaptive: bool = False,
+           dtx: bool = False,
+           trim_silence: bool = False,
+           silence_threshold: float = DEFAULT_SILENCE_THRESHOLD,
+           on_trim: Optional[Callable[[TrimResult], Any]] = None,
            ffmpeg_para: Optional[List[str]] = None) -> Optional[bytes]:
     """
     将音频文件转化为 silkv3 格式
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件(silk)，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标(silk)，默认为None，为None时将返回bytes
 
         codec(Codec.ffmpeg) 编码器，这里是 ffmpeg
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由 ffmpeg 解析格式)
@@ -233,13 +279,17 @@ def encode(input_voice: Union[filelike, bytes],
         t(Num) 持续读取时间,对应 ffmpeg 中的 t (只能精确到秒) 默认为0(不剪切)
         tencent(bool) 是否转化成腾讯的格式
         ios_adaptive(bool) 是否适配 iOS 设备（iOS 的音频码率上限比其他平台低）
+        dtx(bool) 是否开启 DTX（静音帧只输出空包），适合停顿较多的语音 默认为False
+        trim_silence(bool) 是否在编码前裁掉首尾的静音 默认为False
+        silence_threshold(float) 静音阈值(dBFS) 默认为-45
+        on_trim(Callable[[TrimResult], Any]) 裁剪后的回调，可以得知裁掉了多少秒
         ffmpeg_para(list) 额外的 ffmpeg 参数（如 ['-ar', '24000']）
     """
     ...
 
 @overload
 def decode(input_voice: Union[filelike, bytes],
-           output_voice: Union[filelike, None] = None,
+           output_voice: Output = None,
            /,
            codec: Literal[Codec.wave] = Codec.wave) -> Optional[bytes]:
     """
@@ -247,14 +297,14 @@ def decode(input_voice: Union[filelike, bytes],
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件(silk)
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标，默认为None，为None时将返回bytes
         codec(Codec.wave) 编码器，这里是 python 的 wave 标准库
     """
     ...
 
 @overload
 def decode(input_voice: Union[filelike, bytes],
-           output_voice: Union[filelike, None] = None,
+           output_voice: Output = None,
            /,
            codec: Literal[Codec.libsndfile] = Codec.libsndfile,
            audio_format: Optional[str] = None,
@@ -265,7 +315,7 @@ def decode(input_voice: Union[filelike, bytes],
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件(silk)
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标，默认为None，为None时将返回bytes
 
         codec(Codec.libsndfile) 编码器，这里是 libsndfile
         audio_format(str) 音频格式(如mp3, ogg) 默认为None（此时将由 libsndfile 解析格式）
@@ -276,7 +326,7 @@ def decode(input_voice: Union[filelike, bytes],
 
 @overload
 def decode(input_voice: Union[filelike, bytes],
-           output_voice: Union[filelike, None] = None,
+           output_voice: Output = None,
            /,
            codec: Literal[Codec.ffmpeg] = Codec.ffmpeg,
            audio_format: Optional[str] = None,
@@ -288,7 +338,7 @@ def decode(input_voice: Union[filelike, bytes],
 
     Args:
         input_voice(os.PathLike, str, BytesIO, bytes) 输入文件(silk)
-        output_voice(os.PathLike, str, BytesIO, None) 输出文件，默认为None，为None时将返回bytes
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标，默认为None，为None时将返回bytes
 
         codec(Codec.ffmpeg) 编码器，这里是 ffmpeg
         audio_format(str) 音频格式(如mp3, ogg) 默认为None(此时将由 ffmpeg 解析格式)
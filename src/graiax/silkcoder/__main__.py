@@ -1,7 +1,11 @@
 from io import BytesIO
 from . import decode, encode
 from .utils import Codec, CoderError, Codec, choose_encoder, play_audio, issilk, iswave
+from .scanner import scan_many
+from .silence import DEFAULT_SILENCE_THRESHOLD
+from .server import DEFAULT_MAX_BODY_SIZE, DEFAULT_PORT, remote_decode, remote_encode, serve
 import argparse
+import sys
 from pathlib import Path
 
 parser = argparse.ArgumentParser(prog="silkcoder", description="silkv3的编解码器（超简单ver.）")
@@ -17,6 +21,10 @@ encode_parser.add_argument('--tencent', action='store_true', help="是否适配
 encode_parser.add_argument('output', help="输出文件名")
 encode_parser.add_argument('-ss', type=int, help="开始读取时间,对应ffmpeg/avconc中的ss(只能精确到秒) 默认为0(如t为0则忽略)", default=0)
 encode_parser.add_argument('-t', type=int, help="持续读取时间,对应ffmpeg/avconc中的t(只能精确到秒) 默认为0(不剪切)", default=0)
+encode_parser.add_argument('--dtx', action='store_true', help="开启DTX（静音帧只输出空包），默认关闭", default=False)
+encode_parser.add_argument('--trim-silence', action='store_true', help="编码前裁掉首尾的静音，默认关闭", default=False)
+encode_parser.add_argument('--silence-threshold', type=float, help=f"静音阈值(dBFS) 默认为{DEFAULT_SILENCE_THRESHOLD}", default=DEFAULT_SILENCE_THRESHOLD)
+encode_parser.add_argument('--server', help="交给 silkcoder serve 处理（如 unix:/tmp/silkcoder.sock 或 127.0.0.1:8765）")
 encode_parser.set_defaults(func=encode)
 
 decode_parser = subparsers.add_parser("decode", help="解码")
@@ -25,21 +33,63 @@ decode_parser.add_argument('--audio-format', help="音频格式，默认为None"
 decode_parser.add_argument('--codec', type=Codec, choices=list(Codec), help="解码器(如果需要) 默认为None")
 decode_parser.add_argument('--rate', help="输出音频码率，解码情况下则会直接传输给ffmpeg")
 decode_parser.add_argument('output', help="输出文件名")
+decode_parser.add_argument('--server', help="交给 silkcoder serve 处理（如 unix:/tmp/silkcoder.sock 或 127.0.0.1:8765）")
 decode_parser.set_defaults(func=decode)
 
 player_parser = subparsers.add_parser("play", help="播放")
 player_parser.add_argument('input', help="输入文件")
 player_parser.set_defaults(func=play_audio)
 
+scan_parser = subparsers.add_parser("scan", help="检查silk文件是否完整（不解码）")
+scan_parser.add_argument('paths', nargs='+', help="silk文件或文件夹（文件夹会递归检查其中的*.silk）")
+scan_parser.add_argument('--repair', action='store_true', help="将损坏的文件截断到最后一个完整的包，默认关闭", default=False)
+scan_parser.add_argument('--workers', type=int, help="线程数 默认为CPU核数")
+scan_parser.set_defaults(func=scan_many)
+
+serve_parser = subparsers.add_parser("serve", help="常驻编解码服务")
+serve_parser.add_argument('--host', help="监听地址 默认为127.0.0.1", default="127.0.0.1")
+serve_parser.add_argument('--port', type=int, help=f"监听端口 默认为{DEFAULT_PORT}", default=DEFAULT_PORT)
+serve_parser.add_argument('--unix', help="监听 Unix socket 而不是 TCP")
+serve_parser.add_argument('--workers', type=int, help="工作线程数 默认为CPU核数")
+serve_parser.add_argument('--allow-ffmpeg-para', action='store_true', help="接受请求里的 ffmpeg_para（它能让 ffmpeg 以服务的身份读写任意文件），默认关闭", default=False)
+serve_parser.add_argument('--allow-remote', action='store_true', help="允许监听非本机回环地址（服务没有任何认证），默认关闭", default=False)
+serve_parser.add_argument('--max-body-size', type=int, help=f"请求体大小上限(字节) 默认为{DEFAULT_MAX_BODY_SIZE}", default=DEFAULT_MAX_BODY_SIZE)
+serve_parser.add_argument('--max-buffered-requests', type=int, help="同时读进内存的请求体数上限 默认为工作线程数的两倍")
+serve_parser.set_defaults(func=serve)
+
 
 if __name__ == "__main__":
     args = parser.parse_args()
     dict_args = vars(args)
 
-    if (func := dict_args.pop("func")) != play_audio:
+    if (func := dict_args.pop("func")) == serve:
+        serve(**dict_args)
+    elif func == scan_many:
+        paths = (p for path in map(Path, dict_args.pop("paths"))
+                 for p in (sorted(path.rglob("*.silk")) if path.is_dir() else [path]))
+        total, broken = 0, 0
+        for result in scan_many(paths, **dict_args):
+            total += 1
+            if result.ok:
+                continue
+            broken += 1
+            detail = result.error or f"{result.packets} packets, {result.valid_size}/{result.size} bytes"
+            print(f"{result.source}: {result.status} ({detail})"
+                  f"{' [repaired]' if result.repaired else ''}")
+        print(f"{total} files scanned, {broken} broken")
+        if broken:
+            sys.exit(1)
+    elif func != play_audio:
         input_voice = dict_args.pop("i")
         output_voice = dict_args.pop("output")
-        func(input_voice, output_voice, **dict_args)
+        if dict_args.get("trim_silence"):
+            dict_args["on_trim"] = lambda r: print(
+                f"裁掉了 {r.total:.2f}s 静音（开头 {r.leading:.2f}s，结尾 {r.trailing:.2f}s）")
+        if (server := dict_args.pop("server")) is not None:
+            remote = remote_encode if func == encode else remote_decode
+            remote(server, input_voice, output_voice, **dict_args)
+        else:
+            func(input_voice, output_voice, **dict_args)
     else:
         b = Path(dict_args["input"]).read_bytes()
         if issilk(b):
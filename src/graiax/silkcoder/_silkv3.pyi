@@ -1,6 +1,22 @@
-def encode(data: bytes, rate: int, tencent: bool):
+from typing import Any, Callable, Optional
+
+
+def encode(pcm_data: bytes,
+           input_samplerate: int,
+           maximum_samplerate: int,
+           bitrate: int,
+           tencent: bool,
+           complexity: int = 2,
+           packet_size: int = 20,
+           packet_loss: int = 0,
+           use_in_band_fec: bool = False,
+           use_dtx: bool = False,
+           writer: Optional[Callable[[bytes], Any]] = None) -> Optional[bytes]:
     ...
 
 
-def decode(data: bytes):
-    ...
\ No newline at end of file
+def decode(silk_data: bytes,
+           output_samplerate: int = 24000,
+           packet_loss: float = 0,
+           writer: Optional[Callable[[bytes], Any]] = None) -> Optional[bytes]:
+    ...
@@ -2,12 +2,15 @@ import asyncio
 import os
 import subprocess
 import sys
-from typing import Dict, List, Optional, Union
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 
-from .utils import CoderError, get_ffmpeg, soxr_available
+from .utils import CHUNK_SIZE, AsyncSink, CoderError, get_ffmpeg, soxr_available
 
 PIPE = subprocess.PIPE
 Num = Union[int, float]
+# 输入既可以是完整的 bytes，也可以是边生成边写入传给它的函数的生产者（如边解码边输出的 silk_decode）
+Producer = Union[bytes, Callable[[Callable[[bytes], Any]], Any]]
 
 ffmpeg_coder = get_ffmpeg()
 if ffmpeg_coder is not None:
@@ -96,27 +99,133 @@ def get_ffmpeg_decode_cmd(audio_format: str, ffmpeg_para: Optional[List[str]],
     return cmd
 
 
-def ffmpeg_decode(data,
+def _stream_communicate(shell: subprocess.Popen, data: Producer,
+                        writer: Callable[[bytes], Any]) -> bytes:
+    """与 communicate 类似，但 stdout 会在 ffmpeg 输出的同时分块交给 writer"""
+    p_err = []
+    feed_error = []
+
+    def feed():
+        try:
+            if callable(data):
+                data(shell.stdin.write)
+            else:
+                shell.stdin.write(data)
+        except BrokenPipeError:
+            pass
+        except BaseException as e:
+            feed_error.append(e)
+        finally:
+            try:
+                shell.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    threads = [
+        threading.Thread(target=feed, daemon=True),
+        threading.Thread(target=lambda: p_err.append(shell.stderr.read()), daemon=True)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while chunk := shell.stdout.read1(CHUNK_SIZE):
+            writer(chunk)
+    except BaseException:
+        shell.kill()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+        shell.stdout.close()
+        shell.wait()
+    if feed_error:
+        raise feed_error[0]
+    return p_err[0] if p_err else b""
+
+
+def ffmpeg_decode(data: Producer,
                   audio_format: str,
                   ffmpeg_para: Optional[List[str]] = None,
                   rate: Optional[Union[int, str]] = None,
-                  metadata: Optional[Dict[str, Union[str, Num]]] = None):
+                  metadata: Optional[Dict[str, Union[str, Num]]] = None,
+                  writer: Optional[Callable[[bytes], Any]] = None):
+    """
+    传入 writer 时，输出会在 ffmpeg 转码的同时分块写入 writer，并返回 None
+    data 为生产者时，pcm 会在生成的同时送进 ffmpeg
+    """
     cmd = get_ffmpeg_decode_cmd(audio_format, ffmpeg_para, rate, metadata)
     shell = subprocess.Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
-    p_out, p_err = shell.communicate(input=data)
+    if writer is None and not callable(data):
+        p_out, p_err = shell.communicate(input=data)
+    elif writer is None:
+        out = []
+        p_err = _stream_communicate(shell, data, out.append)
+        p_out = b"".join(out)
+    else:
+        p_out, p_err = None, _stream_communicate(shell, data, writer)
     if shell.returncode != 0:
         raise CoderError(f"ffmpeg error:\n{p_err.decode(errors='ignore')}")
     return p_out
 
 
-async def async_ffmpeg_decode(data,
+async def _async_stream_communicate(shell: asyncio.subprocess.Process, data: Producer,
+                                    writer: Callable[[bytes], Awaitable[Any]]) -> bytes:
+
+    async def write_stdin(chunk: bytes):
+        shell.stdin.write(chunk)
+        await shell.stdin.drain()
+
+    async def feed():
+        try:
+            if callable(data):
+                # 生产者（如 silk_decode）是阻塞的，放到线程池里跑，写入再交回事件循环
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, data, AsyncSink(write_stdin, loop).write)
+            else:
+                await write_stdin(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            shell.stdin.close()
+
+    feeder = asyncio.create_task(feed())
+    p_err = asyncio.create_task(shell.stderr.read())
+    try:
+        while chunk := await shell.stdout.read(CHUNK_SIZE):
+            await writer(chunk)
+    except BaseException:
+        shell.kill()
+        raise
+    finally:
+        await feeder
+        await shell.wait()
+    return await p_err
+
+
+async def async_ffmpeg_decode(data: Producer,
                               audio_format: str,
                               ffmpeg_para: Optional[List[str]] = None,
                               rate: Optional[Union[int, str]] = None,
-                              metadata: Optional[Dict[str, Union[str, Num]]] = None):
+                              metadata: Optional[Dict[str, Union[str, Num]]] = None,
+                              writer: Optional[Callable[[bytes], Awaitable[Any]]] = None):
+    """
+    传入 writer（异步）时，输出会在 ffmpeg 转码的同时分块写入 writer，并返回 None
+    data 为生产者时，会在线程池中运行，pcm 在生成的同时送进 ffmpeg
+    """
     cmd = get_ffmpeg_decode_cmd(audio_format, ffmpeg_para, rate, metadata)
     shell = await asyncio.create_subprocess_exec(*cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
-    p_out, p_err = await shell.communicate(input=data)
+    if writer is None and not callable(data):
+        p_out, p_err = await shell.communicate(input=data)
+    elif writer is None:
+        out = []
+
+        async def collect(chunk: bytes):
+            out.append(chunk)
+
+        p_err = await _async_stream_communicate(shell, data, collect)
+        p_out = b"".join(out)
+    else:
+        p_out, p_err = None, await _async_stream_communicate(shell, data, writer)
     if shell.returncode != 0:
         raise CoderError(f"ffmpeg error:\n{p_err.decode(errors='ignore')}")
     return p_out
@@ -1,7 +1,9 @@
 import asyncio
 from email.mime import audio
 from io import BytesIO
-from typing import Dict, Optional, Union
+from typing import Any, Callable, Dict, Optional, Union
+
+from .utils import iter_chunks
 
 try:
     import soundfile
@@ -34,7 +36,8 @@ def sndfile_decode(data: bytes,
                    audio_format: str,
                    subtype: Optional[str] = None,
                    quality: Optional[float] = None,
-                   metadata: Optional[Dict[str, str]] = None):
+                   metadata: Optional[Dict[str, str]] = None,
+                   writer: Optional[Callable[[bytes], Any]] = None):
     if quality is not None and 0 <= quality <= 1:
         raise ValueError("vbr should between 0 and 1")
     pcm, samplerate = soundfile.read(BytesIO(data),
@@ -60,7 +63,11 @@ def sndfile_decode(data: bytes,
                 err = soundfile._snd.sf_error(f._file)
                 raise OSError(err, "Error setting quality for the file")
         f.write(pcm)
-    return b.getvalue()
+    # 大部分格式都要 seek 回去写文件头，所以只能先写进内存再分块输出
+    if writer is None:
+        return b.getvalue()
+    for chunk in iter_chunks(b.getbuffer()):
+        writer(bytes(chunk))
 
 
 async def async_sndfile_encode(data: bytes,
@@ -75,10 +82,11 @@ async def async_sndfile_decode(data: bytes,
                                audio_format: str,
                                subtype: Optional[str] = None,
                                quality: Optional[float] = None,
-                               metadata: Optional[Dict[str, str]] = None):
+                               metadata: Optional[Dict[str, str]] = None,
+                               writer: Optional[Callable[[bytes], Any]] = None):
     return await asyncio.get_running_loop().run_in_executor(None, sndfile_decode, data,
                                                             audio_format, subtype, quality,
-                                                            metadata)
+                                                            metadata, writer)
 
 
 __all__ = [
@@ -0,0 +1,121 @@
+"""
+批量检查 silk 文件是否完整
+
+只遍历包长度表而不真正解码，文件通过 mmap 读取，多个文件在线程池中并行检查（扫描时不占用 GIL）
+"""
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
+
+from . import _silkv3
+from .utils import ArgTypeMixin
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+Source = Union[os.PathLike, str, Buffer]
+# 非腾讯格式的 silk 以长度为 -1 的包结尾
+SILK_END = b"\xff\xff"
+
+
+class ScanStatus(ArgTypeMixin, Enum):
+    valid = 0
+    truncated = 1
+    bad_length = 2
+    missing_header = 3
+    unreadable = 4
+
+
+class ScanResult(NamedTuple):
+    """
+    source: 被检查的路径或 bytes
+    status: 检查结果
+    tencent: 是否为腾讯的格式
+    packets: 完整的包数（出错时即为出错的包的序号）
+    valid_size: 最后一个完整的包结束的位置，修复时会截断到这里（非腾讯格式会再补上结束标记）
+    size: 文件大小
+    repaired: 是否已经截断修复
+    error: 读取文件失败时的错误信息
+    """
+    source: Source
+    status: ScanStatus
+    tencent: bool
+    packets: int
+    valid_size: int
+    size: int
+    repaired: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == ScanStatus.valid
+
+
+def scan(data: Buffer) -> ScanResult:
+    """检查一段 silk 数据（bytes、mmap 等支持 buffer 协议的对象都可以）"""
+    status, tencent, packets, valid_size = _silkv3.scan(data)
+    with memoryview(data) as view:
+        size = view.nbytes
+    return ScanResult(data, ScanStatus(status), tencent, packets, valid_size, size)
+
+
+def scan_file(path: Union[os.PathLike, str], repair: bool = False) -> ScanResult:
+    """
+    检查一个 silk 文件
+
+    Args:
+        path(os.PathLike, str) 文件路径
+        repair(bool) 是否将被截断或者包长度有误的文件截断到最后一个完整的包 默认为False
+            非腾讯格式的文件截断后会补上结束标记；一个完整的包都没有的文件不会修复
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                # 空文件不能 mmap
+                return ScanResult(path, ScanStatus.missing_header, False, 0, 0, 0)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                status, tencent, packets, valid_size = _silkv3.scan(m)
+        status = ScanStatus(status)
+        repaired = False
+        # 一个完整的包都没有的话截断了也还是坏的，不算修复
+        if repair and packets > 0 and status in (ScanStatus.truncated, ScanStatus.bad_length):
+            # 只有真的要修复时才以可写方式打开，只读的归档也能正常检查
+            with open(path, "r+b") as f:
+                f.truncate(valid_size)
+                if not tencent:
+                    f.seek(valid_size)
+                    f.write(SILK_END)
+            repaired = True
+    except OSError as e:
+        return ScanResult(path, ScanStatus.unreadable, False, 0, 0, 0, error=str(e))
+    return ScanResult(path, status, tencent, packets, valid_size, size, repaired)
+
+
+def scan_many(sources: Iterable[Source],
+              repair: bool = False,
+              workers: Optional[int] = None) -> Iterator[ScanResult]:
+    """
+    并行检查多个 silk 文件或 bytes，按传入的顺序返回结果
+
+    Args:
+        sources(Iterable[os.PathLike, str, bytes]) 文件路径，或者 bytes 等支持 buffer 协议的对象
+        repair(bool) 是否截断修复损坏的文件（只对路径有效）默认为False
+        workers(int) 线程数 默认为CPU核数
+    """
+    workers = workers or os.cpu_count() or 1
+    job = lambda source: (scan_file(source, repair)
+                          if isinstance(source, (os.PathLike, str)) else scan(source))
+    with ThreadPoolExecutor(workers) as executor:
+        # 不一次性提交全部任务，免得几百万个文件的 future 堆在内存里
+        pending = deque()
+        for source in sources:
+            pending.append(executor.submit(job, source))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+__all__ = ["ScanStatus", "ScanResult", "scan", "scan_file", "scan_many"]
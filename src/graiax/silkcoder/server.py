@@ -0,0 +1,593 @@
+"""
+常驻的 silkcoder 编解码服务（`silkcoder serve`）
+
+每次都通过 `python -m graiax.silkcoder` 转码的话，解释器启动、导入、查找 ffmpeg、检测 soxr 的开销
+每条消息都要再付一次。这里会常驻一个进程，预先拉起一组工作线程，通过 HTTP（localhost 或 Unix socket）接收任务。
+
+接口：
+    GET  /health            存活检查
+    GET  /stats             工作线程数、队列深度等统计
+    POST /encode?<参数>     请求体为音频，返回 silk，参数与 encode() 一致
+    POST /decode?<参数>     请求体为 silk，返回音频，参数与 decode() 一致（audio_format 必填）
+
+请求体支持 Content-Length 与 chunked，返回体统一使用 chunked，在编解码的同时流式返回
+编码时开启了 trim_silence 的话，裁掉的静音时长通过 X-Silkcoder-Trimmed 响应头返回（如 `leading=0.5; trailing=1.2`）
+"""
+import asyncio
+import http.client
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from . import decode, encode
+from .silence import TrimResult
+from .wav import wav_header
+from .utils import (CHUNK_SIZE, AsyncSink, Codec, CoderError, Output, input_transform,
+                    make_sink)
+
+filelike = Union[os.PathLike, str, BytesIO]
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BODY_SIZE = 64 * 1024 * 1024
+TRIMMED_HEADER = "X-Silkcoder-Trimmed"
+WAV_HEADER_SIZE = 44
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """需要直接以对应状态码返回给客户端的错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _one(conv: Callable[[str], Any]) -> Callable[[List[str]], Any]:
+    return lambda values: conv(values[-1])
+
+
+def _bool(value: str) -> bool:
+    value = value.lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    elif value in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Not a boolean: {value}")
+
+
+def _num(value: str) -> Union[int, float]:
+    f = float(value)
+    return int(f) if f.is_integer() else f
+
+
+def _metadata(values: List[str]) -> Dict[str, str]:
+    return dict(v.split("=", 1) for v in values)
+
+
+ENCODE_OPTIONS: Dict[str, Callable[[List[str]], Any]] = {
+    "codec": _one(Codec.argtype),
+    "audio_format": _one(str),
+    "rate": _one(int),
+    "ss": _one(_num),
+    "t": _one(_num),
+    "tencent": _one(_bool),
+    "ios_adaptive": _one(_bool),
+    "dtx": _one(_bool),
+    "trim_silence": _one(_bool),
+    "silence_threshold": _one(float),
+}
+
+DECODE_OPTIONS: Dict[str, Callable[[List[str]], Any]] = {
+    "codec": _one(Codec.argtype),
+    "audio_format": _one(str),
+    "rate": _one(str),
+    "subtype": _one(str),
+    "quality": _one(float),
+    "metadata": _metadata,
+}
+
+# ffmpeg_para 会原样拼进 ffmpeg 的参数里（输出路径、-f 都能改），等于让请求方以服务的身份读写任意文件
+# 所以默认不接受，只有显式开启 allow_ffmpeg_para 时才会加进上面两张表里
+FFMPEG_PARA_OPTION: Dict[str, Callable[[List[str]], Any]] = {"ffmpeg_para": list}
+
+
+def parse_options(query: Dict[str, List[str]],
+                  table: Dict[str, Callable[[List[str]], Any]]) -> Dict[str, Any]:
+    """将 query string 转换为 encode()/decode() 的参数"""
+    options = {}
+    for key, values in query.items():
+        if key not in table:
+            if key in FFMPEG_PARA_OPTION:
+                raise ValueError(f"{key} is disabled on this server (serve --allow-ffmpeg-para)")
+            raise ValueError(f"Unknown option: {key}")
+        options[key] = table[key](values)
+    return options
+
+
+def is_loopback(host: str) -> bool:
+    """host 解析出来的地址是否全都是本机回环地址"""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except (socket.gaierror, UnicodeError):
+        return False
+    return all(ipaddress.ip_address(info[4][0].split("%", 1)[0]).is_loopback for info in infos)
+
+
+def dump_options(options: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """parse_options 的逆操作，供客户端使用"""
+    query = []
+    for key, value in options.items():
+        if value is None:
+            continue
+        elif isinstance(value, bool):
+            query.append((key, "1" if value else "0"))
+        elif isinstance(value, dict):
+            query.extend((key, f"{k}={v}") for k, v in value.items())
+        elif isinstance(value, (list, tuple)):
+            query.extend((key, str(v)) for v in value)
+        else:
+            query.append((key, str(value)))
+    return query
+
+
+def dump_trim(result: TrimResult) -> str:
+    return f"leading={result.leading}; trailing={result.trailing}"
+
+
+def parse_trim(value: str) -> TrimResult:
+    """dump_trim 的逆操作，供客户端使用"""
+    fields = dict(field.strip().split("=", 1) for field in value.split(";"))
+    return TrimResult(float(fields["leading"]), float(fields["trailing"]))
+
+
+class ChunkedResponse:
+    """以 chunked 编码流式返回的 200 响应，第一次写入时才发送响应头
+
+    在此之前（如编码前裁剪静音时）可以往 headers 里追加响应头
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, keep_alive: bool):
+        self._writer = writer
+        self._keep_alive = keep_alive
+        self.headers: Dict[str, str] = {}
+        self.started = False
+
+    def _start(self):
+        if not self.started:
+            extra = "".join(f"{k}: {v}\r\n" for k, v in self.headers.items())
+            self._writer.write(
+                SilkServer._head(200, self._keep_alive, "application/octet-stream",
+                                 f"Transfer-Encoding: chunked\r\n{extra}"))
+            self.started = True
+
+    async def write(self, data: bytes):
+        self._start()
+        if data:
+            self._writer.write(b"%x\r\n" % len(data))
+            self._writer.write(data)
+            self._writer.write(b"\r\n")
+        await self._writer.drain()
+
+    async def finish(self):
+        self._start()
+        self._writer.write(b"0\r\n\r\n")
+        await self._writer.drain()
+
+
+class SilkServer:
+    """预先拉起工作线程的编解码服务
+
+    silk 编解码时不占用 GIL，ffmpeg 又是子进程，所以用线程池就能吃满多核
+    """
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+                 allow_ffmpeg_para: bool = False,
+                 allow_remote: bool = False,
+                 max_buffered_requests: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_body_size = max_body_size
+        # 最多同时有多少个请求体在内存里，默认为工作线程数的两倍（正在处理的加上排队中的）
+        self.max_buffered_requests = max_buffered_requests or self.workers * 2
+        self._body_slots: Optional[asyncio.Semaphore] = None
+        self.allow_remote = allow_remote
+        self.encode_options = ENCODE_OPTIONS
+        self.decode_options = DECODE_OPTIONS
+        if allow_ffmpeg_para:
+            self.encode_options = {**ENCODE_OPTIONS, **FFMPEG_PARA_OPTION}
+            self.decode_options = {**DECODE_OPTIONS, **FFMPEG_PARA_OPTION}
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="silkcoder")
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def warmup(self):
+        """让线程池把全部工作线程都先拉起来，而不是等到第一批任务进来时再创建"""
+        barrier = threading.Barrier(self.workers)
+        for future in [self._executor.submit(barrier.wait) for _ in range(self.workers)]:
+            future.result()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "uptime": round(time.monotonic() - self._started, 3),
+            }
+
+    def _job(self, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+            return result
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs):
+        """在工作线程中执行任务"""
+        with self._lock:
+            self.queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._job, func, args, kwargs)
+
+    async def start(self,
+                    host: str = "127.0.0.1",
+                    port: int = DEFAULT_PORT,
+                    unix: Union[os.PathLike, str, None] = None) -> asyncio.AbstractServer:
+        """
+        开始监听，传入 unix 时将监听 Unix socket 而不是 TCP
+
+        服务没有任何认证，所以除非开启了 allow_remote，否则只允许监听本机回环地址
+        """
+        if unix is None and not self.allow_remote and not is_loopback(host):
+            raise ValueError(f"Refusing to listen on non-loopback address {host!r} "
+                             "without allow_remote (serve --allow-remote)")
+        # Python 3.8/3.9 的 Semaphore 会绑定创建时的事件循环，所以放到这里创建
+        self._body_slots = asyncio.Semaphore(self.max_buffered_requests)
+        await asyncio.get_running_loop().run_in_executor(None, self.warmup)
+        if unix is None:
+            return await asyncio.start_server(self.handle, host, port)
+        path = Path(unix)
+        if path.is_socket():
+            # 上次没有正常退出留下来的
+            path.unlink()
+        return await asyncio.start_unix_server(self.handle, os.fspath(path))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while await self._handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader,
+                              writer: asyncio.StreamWriter) -> bool:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return False
+        except asyncio.LimitOverrunError:
+            await self._respond(writer, 400, b"Header too large", keep_alive=False)
+            return False
+
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = request_line.split(" ", 2)
+        except ValueError:
+            await self._respond(writer, 400, b"Malformed request line", keep_alive=False)
+            return False
+        headers = {}
+        for line in header_lines:
+            if line:
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+        keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+
+        url = urlsplit(target)
+        try:
+            if url.path in ("/health", "/stats"):
+                if method != "GET":
+                    raise HTTPError(405, "Use GET")
+                body = {"status": "ok"} if url.path == "/health" else self.stats()
+                await self._respond(writer, 200, json.dumps(body).encode(), keep_alive,
+                                    "application/json")
+            elif url.path in ("/encode", "/decode"):
+                if method != "POST":
+                    raise HTTPError(405, "Use POST")
+                # 编解码要拿到完整的输入，所以请求体只能整个读进内存
+                # 同时在读/在处理的请求体数有上限，免得大量并发上传把内存吃光
+                async with self._body_slots:
+                    data = await self._read_body(reader, headers)
+                    response = ChunkedResponse(writer, keep_alive)
+                    try:
+                        if url.path == "/encode":
+                            func, table = encode, self.encode_options
+                        else:
+                            func, table = decode, self.decode_options
+                        options = parse_options(parse_qs(url.query), table)
+                        if func is encode and options.get("trim_silence"):
+                            # 裁剪在编码开始前就完成了，赶得上随第一块数据一起发出的响应头
+                            options["on_trim"] = lambda r: response.headers.update(
+                                {TRIMMED_HEADER: dump_trim(r)})
+                        await self.run(func, data, AsyncSink(response.write), **options)
+                    except Exception as e:
+                        if response.started:
+                            # 已经开始返回数据了，只能直接断开让客户端知道没传完
+                            return False
+                        status = 400 if isinstance(e, ValueError) else 500
+                        message = str(e) if status == 400 else f"{type(e).__name__}: {e}"
+                        raise HTTPError(status, message) from e
+                    await response.finish()
+            else:
+                raise HTTPError(404, f"No such endpoint: {url.path}")
+        except HTTPError as e:
+            # 请求体可能没读完，直接断开比较保险
+            await self._respond(writer, e.status, str(e).encode(), keep_alive=False)
+            return False
+        return keep_alive
+
+    def _check_body_size(self, size: int):
+        if size > self.max_body_size:
+            raise HTTPError(413, f"Request body larger than {self.max_body_size} bytes")
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        body = bytearray()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            try:
+                while True:
+                    size_line = await reader.readuntil(b"\r\n")
+                    try:
+                        size = int(size_line.split(b";", 1)[0], 16)
+                    except ValueError as e:
+                        raise HTTPError(400, "Malformed chunk size") from e
+                    if size == 0:
+                        # 跳过 trailer
+                        while await reader.readuntil(b"\r\n") != b"\r\n":
+                            pass
+                        break
+                    self._check_body_size(len(body) + size)
+                    body += await reader.readexactly(size)
+                    await reader.readexactly(2)
+            except asyncio.LimitOverrunError as e:
+                raise HTTPError(400, "Chunk size line or trailer too long") from e
+        elif "content-length" in headers:
+            try:
+                remain = int(headers["content-length"])
+            except ValueError as e:
+                raise HTTPError(400, "Malformed Content-Length") from e
+            if remain < 0:
+                raise HTTPError(400, "Malformed Content-Length")
+            self._check_body_size(remain)
+            while remain > 0:
+                chunk = await reader.read(min(CHUNK_SIZE, remain))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(bytes(body), remain)
+                body += chunk
+                remain -= len(chunk)
+        else:
+            raise HTTPError(411, "Content-Length or chunked body required")
+        return bytes(body)
+
+    @staticmethod
+    def _head(status: int, keep_alive: bool, content_type: str, extra: str) -> bytes:
+        return (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"{extra}"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1")
+
+    async def _respond(self,
+                       writer: asyncio.StreamWriter,
+                       status: int,
+                       body: bytes,
+                       keep_alive: bool,
+                       content_type: str = "text/plain; charset=utf-8"):
+        writer.write(
+            self._head(status, keep_alive, content_type, f"Content-Length: {len(body)}\r\n"))
+        writer.write(body)
+        await writer.drain()
+
+
+def serve(host: str = "127.0.0.1",
+          port: int = DEFAULT_PORT,
+          unix: Union[os.PathLike, str, None] = None,
+          workers: Optional[int] = None,
+          max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+          allow_ffmpeg_para: bool = False,
+          allow_remote: bool = False,
+          max_buffered_requests: Optional[int] = None):
+    """
+    启动编解码服务，直到被 Ctrl+C 中断
+
+    allow_ffmpeg_para 为 True 时才接受请求里的 ffmpeg_para（它能让 ffmpeg 读写任意文件）
+    allow_remote 为 True 时才允许监听非本机回环地址（服务没有任何认证）
+    max_buffered_requests 为同时读进内存的请求体数上限，内存占用最多约为它乘以 max_body_size
+    """
+
+    async def main():
+        server = SilkServer(workers, max_body_size, allow_ffmpeg_para, allow_remote,
+                            max_buffered_requests)
+        listener = await server.start(host, port, unix)
+        where = f"unix:{os.fspath(unix)}" if unix is not None else f"http://{host}:{port}"
+        print(f"silkcoder serving on {where} with {server.workers} workers")
+        try:
+            async with listener:
+                await listener.serve_forever()
+        finally:
+            server.close()
+            if unix is not None and Path(unix).is_socket():
+                Path(unix).unlink()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """走 Unix socket 的 HTTPConnection"""
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def connect(server: str, timeout: Optional[float] = None) -> http.client.HTTPConnection:
+    """server 可以是 `unix:/path/to.sock`、`http://host:port` 或 `host:port`"""
+    if server.startswith("unix:"):
+        return UnixHTTPConnection(server[5:], timeout)
+    url = urlsplit(server if "://" in server else f"http://{server}")
+    return http.client.HTTPConnection(url.hostname or "127.0.0.1", url.port or DEFAULT_PORT,
+                                      timeout=timeout)
+
+
+def _request(server: str,
+             endpoint: str,
+             input_voice: Union[filelike, bytes],
+             output_voice: Output,
+             options: Dict[str, Any],
+             timeout: Optional[float],
+             on_response: Optional[Callable[[http.client.HTTPResponse], Any]] = None,
+             fix_wav_header: bool = False) -> Optional[bytes]:
+    conn = connect(server, timeout)
+    url = f"{endpoint}?{urlencode(dump_options(options))}"
+    try:
+        try:
+            if isinstance(input_voice, (os.PathLike, str)):
+                # 文件直接流式上传，不先读进内存
+                with open(input_voice, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    conn.request("POST", url, body=f, headers={"Content-Length": str(size)})
+            else:
+                conn.request("POST", url, body=input_transform(input_voice))
+        except (BrokenPipeError, ConnectionResetError) as e:
+            # 服务端拒绝请求（如 413）时不会读完请求体就断开，响应一般还能读到
+            try:
+                resp = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                raise CoderError("silkcoder server closed the connection while sending the request") from e
+        else:
+            resp = conn.getresponse()
+        if resp.status != 200:
+            message = resp.read().decode(errors="ignore")
+            if resp.status == 400:
+                raise ValueError(message)
+            raise CoderError(f"silkcoder server error ({resp.status}):\n{message}")
+        if on_response is not None:
+            on_response(resp)
+        with make_sink(output_voice) as sink:
+            size, head = 0, b""
+            while chunk := resp.read(CHUNK_SIZE):
+                if len(head) < WAV_HEADER_SIZE:
+                    head += chunk[:WAV_HEADER_SIZE - len(head)]
+                size += len(chunk)
+                sink.write(chunk)
+            if fix_wav_header and head == wav_header(None):
+                # 服务端是边解码边返回的，wav 文件头里没有长度，输出能 seek 的话在这里补上
+                sink.patch(0, wav_header(size - WAV_HEADER_SIZE))
+    except http.client.IncompleteRead as e:
+        raise CoderError("silkcoder server closed the connection before finishing") from e
+    finally:
+        conn.close()
+    return sink.getvalue()
+
+
+def remote_encode(server: str,
+                  input_voice: Union[filelike, bytes],
+                  output_voice: Output = None,
+                  /,
+                  timeout: Optional[float] = None,
+                  on_trim: Optional[Callable[[TrimResult], Any]] = None,
+                  **kwargs) -> Optional[bytes]:
+    """
+    通过 silkcoder serve 将音频文件转化为 silkv3 格式
+
+    Args:
+        server(str) 服务地址，如 `unix:/tmp/silkcoder.sock`、`127.0.0.1:8765`
+        input_voice(os.PathLike, str, BytesIO, bytes) 输入文件
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标(silk)，默认为None，为None时将返回bytes
+        timeout(float) 超时时间 默认为None(不超时)
+        on_trim(Callable[[TrimResult], Any]) 服务端裁剪静音后的回调，可以得知裁掉了多少秒
+        其余参数与 encode() 一致
+    """
+
+    def on_response(resp: http.client.HTTPResponse):
+        if on_trim is not None and (trimmed := resp.getheader(TRIMMED_HEADER)) is not None:
+            on_trim(parse_trim(trimmed))
+
+    return _request(server, "/encode", input_voice, output_voice, kwargs, timeout, on_response)
+
+
+def remote_decode(server: str,
+                  input_voice: Union[filelike, bytes],
+                  output_voice: Output = None,
+                  /,
+                  timeout: Optional[float] = None,
+                  audio_format: Optional[str] = None,
+                  **kwargs) -> Optional[bytes]:
+    """
+    通过 silkcoder serve 将silkv3音频转换为其他音频格式
+
+    Args:
+        server(str) 服务地址，如 `unix:/tmp/silkcoder.sock`、`127.0.0.1:8765`
+        input_voice(os.PathLike, str, BytesIO, bytes) 输入文件(silk)
+        output_voice(os.PathLike, str, 文件对象, fd, 回调函数, None) 输出目标，默认为None，为None时将返回bytes
+        timeout(float) 超时时间 默认为None(不超时)
+        其余参数与 decode() 一致
+    """
+    if audio_format is None:
+        if isinstance(output_voice, (os.PathLike, str)):
+            audio_format = Path(output_voice).suffix[1:]
+        else:
+            raise ValueError("Pls tell me what audio format to use")
+    return _request(server, "/decode", input_voice, output_voice,
+                    {"audio_format": audio_format, **kwargs}, timeout,
+                    fix_wav_header=audio_format.lower() == "wav")
+
+
+__all__ = [
+    "SilkServer", "serve", "remote_encode", "remote_decode", "DEFAULT_PORT", "DEFAULT_MAX_BODY_SIZE"
+]
@@ -0,0 +1,57 @@
+import audioop
+from typing import NamedTuple, Tuple
+
+# 编码前的 pcm 统一为 24000Hz 单声道 s16le
+BYTES_PER_SECOND = 24000 * 2
+FRAME_SIZE = BYTES_PER_SECOND // 50  # 20ms，与 silk 的帧长一致
+DEFAULT_SILENCE_THRESHOLD = -45  # dBFS
+
+
+class TrimResult(NamedTuple):
+    """被裁掉的静音时长（秒）"""
+    leading: float
+    trailing: float
+
+    @property
+    def total(self) -> float:
+        return self.leading + self.trailing
+
+
+def strip_silence(pcm: bytes,
+                  threshold: float = DEFAULT_SILENCE_THRESHOLD,
+                  padding: float = 0.1) -> Tuple[bytes, TrimResult]:
+    """
+    裁掉 pcm 首尾的静音
+
+    只从两端向中间扫描到第一帧有声音为止，所以开销只跟静音的长度有关
+    整段都是静音时会保留一帧，保证输出的 silk 里至少有一个包
+
+    Args:
+        pcm(bytes) 24000Hz 单声道 s16le 的 pcm
+        threshold(float) 静音阈值(dBFS) 20ms 内的均方根低于该值即视为静音 默认为-45
+        padding(float) 在声音前后额外保留的时长(秒)，避免切掉开头结尾的辅音 默认为0.1
+    """
+    limit = int(32768 * 10**(threshold / 20))
+    frames = len(pcm) // FRAME_SIZE
+    loud = lambda i: audioop.rms(pcm[i * FRAME_SIZE:(i + 1) * FRAME_SIZE], 2) >= limit
+
+    start = 0
+    while start < frames and not loud(start):
+        start += 1
+    if start == frames:
+        kept = min(len(pcm), FRAME_SIZE)
+        # 保留的是开头那一帧，裁掉的都算在结尾
+        return pcm[:kept], TrimResult(0, (len(pcm) - kept) / BYTES_PER_SECOND)
+    end = frames
+    while not loud(end - 1):
+        end -= 1
+
+    pad = int(padding * 50)
+    begin = max(start - pad, 0) * FRAME_SIZE
+    # 不足一帧的尾巴只有在保留到最后一帧时才留下
+    stop = len(pcm) if end + pad >= frames else (end + pad) * FRAME_SIZE
+    return pcm[begin:stop], TrimResult(begin / BYTES_PER_SECOND,
+                                       (len(pcm) - stop) / BYTES_PER_SECOND)
+
+
+__all__ = ["strip_silence", "TrimResult", "DEFAULT_SILENCE_THRESHOLD"]
@@ -1,31 +1,56 @@
 from . import _silkv3
 import asyncio
+from functools import partial
+from typing import Any, Callable, Optional
 
+Writer = Optional[Callable[[bytes], Any]]
 
-def silk_encode(data: bytes, rate: int = -1, tencent: bool = True, ios_adaptive: bool = False):
+
+def _target_rate(data: bytes, rate: int, ios_adaptive: bool):
     if rate < 0:
+        if not data:
+            return 24000 if ios_adaptive else 100000
         #保证压制出来的音频在1000kb上下，若音频时常在10min以内而不超过1Mb
         rate = min(int(980 * 1024 / (len(data) / 24000 / 2) * 8), 24000 if ios_adaptive else 100000)
-    return _silkv3.encode(data, rate, tencent)
+    return rate
+
+
+def silk_encode(data: bytes,
+                rate: int = -1,
+                tencent: bool = True,
+                ios_adaptive: bool = False,
+                writer: Writer = None,
+                dtx: bool = False):
+    """
+    传入 writer 时，silk 会在编码过程中分块写入 writer，并返回 None
+    dtx 为 True 时，静音帧将只输出空包（DTX，不连续传输）
+    """
+    rate = _target_rate(data, rate, ios_adaptive)
+    return _silkv3.encode(data, 24000, 24000, rate, tencent, use_dtx=dtx, writer=writer)
 
 
 async def async_silk_encode(data: bytes,
                             rate: int = -1,
                             tencent: bool = True,
-                            ios_adaptive: bool = False):
-    if rate < 0:
-        #保证压制出来的音频在1000kb上下，若音频时常在10min以内而不超过1Mb
-        rate = min(int(980 * 1024 / (len(data) / 24000 / 2) * 8), 24000 if ios_adaptive else 100000)
+                            ios_adaptive: bool = False,
+                            writer: Writer = None,
+                            dtx: bool = False):
+    rate = _target_rate(data, rate, ios_adaptive)
     loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, _silkv3.encode, data, rate, tencent)
+    return await loop.run_in_executor(
+        None,
+        partial(_silkv3.encode, data, 24000, 24000, rate, tencent, use_dtx=dtx,
+                writer=writer))
 
 
-def silk_decode(data: bytes):
-    return _silkv3.decode(data)
+def silk_decode(data: bytes, writer: Writer = None):
+    """传入 writer 时，pcm 会在解码过程中分块写入 writer，并返回 None"""
+    return _silkv3.decode(data, writer=writer)
 
 
-async def async_silk_decode(data: bytes):
-    return await asyncio.get_running_loop().run_in_executor(None, _silkv3.decode, data)
+async def async_silk_decode(data: bytes, writer: Writer = None):
+    return await asyncio.get_running_loop().run_in_executor(
+        None, partial(_silkv3.decode, data, writer=writer))
 
 
-__all__ = ["silk_encode", "silk_decode", "async_silk_encode", "async_silk_decode"]
\ No newline at end of file
+__all__ = ["silk_encode", "silk_decode", "async_silk_encode", "async_silk_decode"]
@@ -1,4 +1,7 @@
+import asyncio
+import inspect
 import os
+import stat
 import subprocess
 import sys
 import wave
@@ -6,7 +9,7 @@ from io import BytesIO
 from enum import Enum
 from pathlib import Path
 from shutil import which
-from typing import Union, Optional
+from typing import Any, Awaitable, BinaryIO, Callable, Iterator, Union, Optional
 
 try:
     import imageio_ffmpeg
@@ -63,6 +66,240 @@ class CoderError(Exception):
     pass
 
 
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_chunks(data: bytes, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """将 data 按 size 切块"""
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class Sink:
+    """输出目标
+
+    编解码器通过 write 分块写入，全部写完后调用 close，出错时调用 abort
+    可以作为（异步）上下文管理器使用，正常退出时 close，异常退出时 abort
+    """
+
+    def write(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def patch(self, offset: int, data: bytes) -> bool:
+        """覆盖已经写入的 offset 处的数据（如补写文件头），不支持时返回 False"""
+        return False
+
+    async def awrite(self, data: bytes) -> None:
+        self.write(data)
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+    def getvalue(self) -> Optional[bytes]:
+        """输出到内存时返回全部数据，否则返回 None"""
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.__exit__(exc_type, exc, tb)
+
+
+class BufferSink(Sink):
+    """输出到内存，对应 output_voice 为 None 的情况"""
+
+    def __init__(self):
+        self._buffer = BytesIO()
+
+    def write(self, data: bytes):
+        self._buffer.write(data)
+
+    def patch(self, offset: int, data: bytes) -> bool:
+        self._buffer.getbuffer()[offset:offset + len(data)] = data
+        return True
+
+    def getvalue(self) -> bytes:
+        return self._buffer.getvalue()
+
+
+class FileSink(Sink):
+    """输出到任何有 write 方法的二进制文件对象（不会关闭它）"""
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        seekable = getattr(file, "seekable", None)
+        # 文件里可能已经有别的内容了，patch 的 offset 从开始写入的位置算起
+        self._start = file.tell() if seekable is not None and seekable() else None
+
+    def write(self, data: bytes):
+        self._file.write(data)
+
+    def patch(self, offset: int, data: bytes) -> bool:
+        if self._start is None:
+            return False
+        end = self._file.tell()
+        self._file.seek(self._start + offset)
+        self._file.write(data)
+        self._file.seek(end)
+        return True
+
+    def close(self):
+        flush = getattr(self._file, "flush", None)
+        if flush is not None:
+            flush()
+
+
+class FdSink(Sink):
+    """输出到文件描述符（不会关闭它）"""
+
+    def __init__(self, fd: int):
+        self._fd = fd
+
+    def write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+
+
+class CallbackSink(Sink):
+    """每一块数据都交给回调函数"""
+
+    def __init__(self, callback: Callable[[bytes], Any]):
+        self._callback = callback
+
+    def write(self, data: bytes):
+        self._callback(data)
+
+
+class PathSink(Sink):
+    """输出到路径
+
+    先写到同目录下的临时文件，完成后再换名，所以其他人永远不会读到写了一半的文件
+    """
+
+    def __init__(self, path: Union[os.PathLike, str]):
+        self._path = Path(path)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+        while True:
+            self._tmp = self._path.with_name(f".{self._path.name}.{os.urandom(4).hex()}.tmp")
+            try:
+                # 不用 mkstemp（权限固定为 0600），由系统按 umask 决定权限，和直接 open 写出来的一样
+                fd = os.open(self._tmp, flags, 0o666)
+                break
+            except FileExistsError:
+                continue
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes):
+        self._file.write(data)
+
+    def patch(self, offset: int, data: bytes) -> bool:
+        self._file.seek(offset)
+        self._file.write(data)
+        self._file.seek(0, os.SEEK_END)
+        return True
+
+    def close(self):
+        self._file.close()
+        try:
+            # 覆盖已有文件时沿用它原来的权限
+            os.chmod(self._tmp, stat.S_IMODE(os.stat(self._path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(self._tmp, self._path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.unlink(self._tmp)
+        except FileNotFoundError:
+            pass
+
+
+class AsyncSink(Sink):
+    """输出到异步写入函数（如 aiohttp 的 StreamResponse.write）
+
+    编解码器一般跑在工作线程里，write 会把数据交回事件循环写入并等待写完（自带背压）
+    """
+
+    def __init__(self,
+                 write: Callable[[bytes], Awaitable[Any]],
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError as e:
+                raise ValueError("Async output can only be used in async_encode/async_decode") from e
+        self._write = write
+        self._loop = loop
+
+    def write(self, data: bytes):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            raise RuntimeError("AsyncSink.write can't be called in its own event loop, use awrite")
+        asyncio.run_coroutine_threadsafe(self.awrite(data), self._loop).result()
+
+    async def awrite(self, data: bytes):
+        await self._write(data)
+
+
+def _stream_writer_write(writer: asyncio.StreamWriter) -> Callable[[bytes], Awaitable[None]]:
+
+    async def write(data: bytes):
+        writer.write(data)
+        await writer.drain()
+
+    return write
+
+
+Output = Union[os.PathLike, str, BinaryIO, int, Callable[[bytes], Any], Sink, None]
+
+
+def make_sink(output_: Output) -> Sink:
+    """
+    将输出目标统一转换为 Sink
+
+    支持: None(输出到内存) 路径 文件对象 文件描述符 asyncio.StreamWriter
+          有异步 write 方法的对象 回调函数/异步回调函数 Sink
+    """
+    if isinstance(output_, Sink):
+        return output_
+    elif output_ is None:
+        return BufferSink()
+    elif isinstance(output_, (os.PathLike, str)):
+        return PathSink(output_)
+    elif isinstance(output_, int):
+        return FdSink(output_)
+    elif isinstance(output_, asyncio.StreamWriter):
+        return AsyncSink(_stream_writer_write(output_))
+    elif (write := getattr(output_, "write", None)) is not None:
+        if inspect.iscoroutinefunction(write):
+            return AsyncSink(write)
+        return FileSink(output_)
+    elif callable(output_):
+        if inspect.iscoroutinefunction(output_):
+            return AsyncSink(output_)
+        return CallbackSink(output_)
+    else:
+        raise ValueError("Unsupport format")
+
+
 def input_transform(input_: Union[os.PathLike, str, BytesIO, bytes]) -> bytes:
     if isinstance(input_, (os.PathLike, str)):
         return Path(input_).read_bytes()
@@ -74,16 +311,13 @@ def input_transform(input_: Union[os.PathLike, str, BytesIO, bytes]) -> bytes:
         raise ValueError("Unsupport format")
 
 
-def output_transform(output_: Union[os.PathLike, str, BytesIO, None],
-                     data: bytes) -> Optional[bytes]:
-    if isinstance(output_, (os.PathLike, str)):
-        Path(output_).write_bytes(data)
-    elif isinstance(output_, BytesIO):
-        output_.write(data)
-    elif output_ is None:
+def output_transform(output_: Output, data: bytes) -> Optional[bytes]:
+    """将已经完整生成的 data 写入输出目标，output_ 为 None 时返回 data"""
+    if output_ is None:
         return data
-    else:
-        raise ValueError("Unsupport format")
+    with make_sink(output_) as sink:
+        for chunk in iter_chunks(data):
+            sink.write(chunk)
 
 
 def iswave(data: bytes):
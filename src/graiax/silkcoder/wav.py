@@ -1,7 +1,10 @@
 import audioop
+import struct
 import wave
 from io import BytesIO
-from typing import Union
+from typing import Any, Callable, Optional, Union
+
+from .utils import iter_chunks
 
 Num = Union[int, float]
 
@@ -27,13 +30,47 @@ def wav_encode(data: bytes, ss: Num = 0, t: Num = -1):
         return wav_data
 
 
-def wav_decode(data: bytes):
-    with wave.open(b := BytesIO(), 'wb') as wav_out:
-        wav_out.setnchannels(1)
-        wav_out.setsampwidth(2)
-        wav_out.setframerate(24000)
-        wav_out.writeframes(data)
-    return b.getvalue()
+def wav_header(size: Optional[int]):
+    """
+    24000Hz 单声道 16bit 的 wav 文件头（与 wave 标准库写出来的一致）
+    size 为 None 时表示长度未知，长度字段按流式 wav 的惯例填 0xFFFFFFFF
+    """
+    riff_size, data_size = (0xFFFFFFFF, 0xFFFFFFFF) if size is None else (36 + size, size)
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", riff_size, b"WAVE", b"fmt ", 16, 1, 1,
+                       24000, 24000 * 2, 2, 16, b"data", data_size)
+
+
+def wav_decode(data: bytes, writer: Optional[Callable[[bytes], Any]] = None):
+    # pcm 长度已知，文件头可以先写，不需要 seek 回来改
+    if writer is None:
+        return wav_header(len(data)) + data
+    writer(wav_header(len(data)))
+    for chunk in iter_chunks(data):
+        writer(chunk)
+
+
+def wav_stream_decode(produce: Callable[[Callable[[bytes], Any]], Any],
+                      writer: Callable[[bytes], Any]) -> int:
+    """
+    produce 会把 pcm 边解码边写入传给它的函数，所以文件头只能先按长度未知写出
+    返回 pcm 的长度，输出能 seek 的话可以再用 wav_header 补写正确的文件头
+    """
+    size = -1
+
+    def write(chunk: bytes):
+        nonlocal size
+        # 等第一块 pcm 出来再写文件头，produce 在开始前就出错（如输入不是 silk）时不会留下半个文件
+        if size < 0:
+            writer(wav_header(None))
+            size = 0
+        size += len(chunk)
+        writer(chunk)
+
+    produce(write)
+    if size < 0:
+        writer(wav_header(None))
+        size = 0
+    return size
 
 
-__all__ = ["wav_encode", "wav_decode"]
+__all__ = ["wav_encode", "wav_decode", "wav_stream_decode"]